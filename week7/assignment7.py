@@ -1,125 +1,253 @@
 import json
+import math
+import os
+import re
+from array import array
 import tkinter as tk
-from tkinter import ttk, messagebox
-from datetime import datetime
+from tkinter import ttk, filedialog, messagebox
+from datetime import date, datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_DATE_RE = re.compile(r"([0-9]{4})-([0-9]{2})-([0-9]{2})")
+
+
+# orjson is optional, it encodes/decodes much faster than the json module.
+# both versions work with bytes so the files can be read and written whole
+if orjson is not None:
+
+    def _json_dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    _json_loads = orjson.loads
+else:
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, indent=4).encode()
+
+    _json_loads = json.loads
 
 
 class DataHandler:
     def __init__(self, autosave=True):
         self.autosave = autosave
-        self.incomes = []
-        self.expenses = []
+        # records are keyed by an id that only ever grows, so deleting one
+        # doesn't shift the rest. dicts keep insertion order for display
+        self.incomes = {}
+        self.expenses = {}
         self.files_loaded = True
+        # set by every mutation, cleared once the data has been written out
+        self._dirty = False
         try:
             # if loading from file failed, initialize everything to empty
             # to avoid crashing the programm
             self.load_from_file()
+            self._rebuild_amounts()
         except Exception:
-            self.incomes = []
-            self.expenses = []
+            self.incomes = {}
+            self.expenses = {}
             self.files_loaded = False
-
-    def add_income(self, source: str, amount: float):
+            self._rebuild_amounts()
+
+    def clear(self):
+        self.incomes = {}
+        self.expenses = {}
+        self._rebuild_amounts()
+        self._dirty = True
+
+    def _rebuild_amounts(self):
+        # amounts are mirrored into flat double arrays indexed by record id,
+        # so reductions run in C without a dict lookup per record. deleted
+        # records leave a 0.0 behind. running totals are kept up to date by
+        # add/delete, a full pass is only needed when the records are
+        # replaced wholesale, which always leaves ids 0..n-1
+        self.income_amounts = array("d", [i["amount"] for i in self.incomes.values()])
+        self.expense_amounts = array(
+            "d", [e["amount"] for e in self.expenses.values()]
+        )
+        self._next_income_id = len(self.income_amounts)
+        self._next_expense_id = len(self.expense_amounts)
+        self._income_total = math.fsum(self.income_amounts)
+        self._expense_total = math.fsum(self.expense_amounts)
+
+    def add_income(self, source: str, amount: float) -> int:
+        if not math.isfinite(amount):
+            raise ValueError("Income amount must be a finite number")
         if amount < 0:
             raise ValueError("Income amount can't be negative")
         if not source.strip():
             raise ValueError("Income source must be non-empty")
 
-        self.incomes.append({"source": source, "amount": amount})
-        self.save_to_file()
-
-    def add_expense(self, description: str, category: str, amount: float, date: str):
+        income = {"source": source, "amount": amount}
+        income_id = self._next_income_id
+        self._next_income_id += 1
+        self.incomes[income_id] = income
+        self.income_amounts.append(amount)
+        self._income_total += amount
+        self._dirty = True
+        return income_id
+
+    def add_expense(
+        self, description: str, category: str, amount: float, date: str
+    ) -> int:
         if not category.strip():
             raise ValueError("Category must be non-empty")
         if not description.strip():
             raise ValueError("Description must be non-empty")
+        if not math.isfinite(amount):
+            raise ValueError("Expense amount must be a finite number")
         if amount < 0:
             raise ValueError("Expense amount can't be negative")
-        date = parse_date(date)
-        self.expenses.append(
-            {
-                "description": description,
-                "category": category,
-                "amount": amount,
-                "date": date,
-            }
-        )
-        self.save_to_file()
-
-    def delete_income(self, index: int):
-        del self.incomes[index]
-        self.save_to_file()
-
-    def delete_expense(self, index: int):
-        del self.expenses[index]
-        self.save_to_file()
+        return self._add_expense_raw(description, category, amount, parse_date(date))
+
+    def _add_expense_raw(
+        self, description: str, category: str, amount: float, date: str
+    ) -> int:
+        # no validation here, callers must have checked the inputs and
+        # normalized the date already (the UI does this before calling)
+        expense = {
+            "description": description,
+            "category": category,
+            "amount": amount,
+            "date": date,
+        }
+        expense_id = self._next_expense_id
+        self._next_expense_id += 1
+        self.expenses[expense_id] = expense
+        self.expense_amounts.append(amount)
+        self._expense_total += amount
+        self._dirty = True
+        return expense_id
+
+    def delete_income(self, income_id: int):
+        del self.incomes[income_id]
+        self._income_total -= self.income_amounts[income_id]
+        self.income_amounts[income_id] = 0.0
+        # subtracting can leave float residue like -7e-15 behind
+        if not self.incomes:
+            self._income_total = 0.0
+        self._dirty = True
+
+    def delete_expense(self, expense_id: int):
+        del self.expenses[expense_id]
+        self._expense_total -= self.expense_amounts[expense_id]
+        self.expense_amounts[expense_id] = 0.0
+        # subtracting can leave float residue like -7e-15 behind
+        if not self.expenses:
+            self._expense_total = 0.0
+        self._dirty = True
 
     def total_income(self) -> float:
-        return sum(i["amount"] for i in self.incomes)
+        return self._income_total
 
     def total_expenses(self) -> float:
-        return sum(e["amount"] for e in self.expenses)
+        return self._expense_total
 
     def balance(self) -> float:
         return self.total_income() - self.total_expenses()
 
+    def flush(self):
+        # write pending changes, if there are any
+        if not self._dirty:
+            return
+        self.save_to_file()
+        self._dirty = False
+
     def save_to_file(self):
+        # only JSON is kept up to date, the txt format is written on export
         # avoid saving for unit tests
         if not self.autosave:
             return
 
-        with open("finance_data.json", "w") as f:
-            data = {"incomes": self.incomes, "expenses": self.expenses}
-            json.dump(data, f, indent=4)
-        with open("finance_data.txt", "w") as f:
-            expense_lines = [
-                f'Expense|{expense["description"]}|{expense["category"]}|{expense["amount"]}|{expense["date"]}\n'
-                for expense in self.expenses
-            ]
-            income_lines = [
-                f'Income|{income["source"]}|{income["amount"]}\n'
-                for income in self.incomes
-            ]
-            f.writelines(expense_lines)
-            f.writelines(income_lines)
+        # encode everything up front and hand the file a single write
+        data = {
+            "incomes": list(self.incomes.values()),
+            "expenses": list(self.expenses.values()),
+        }
+        _atomic_write("finance_data.json", _json_dumps(data))
+
+    def export_txt(self, path: str):
+        expense_lines = map(format_expense_line, self.expenses.values())
+        income_lines = map(format_income_line, self.incomes.values())
+        payload = "".join(expense_lines) + "".join(income_lines)
+        _atomic_write(path, payload.encode("utf-8"))
 
     def load_from_file(self):
         # JSON is primary source of data
-        # text is a fallback
+        # text (as written by export_txt) is a fallback
         try:
-            with open("finance_data.json", "r") as f:
-                data = json.load(f)
-                self.expenses = data["expenses"] or []
-                self.incomes = data["incomes"] or []
+            with open("finance_data.json", "rb") as f:
+                data = _json_loads(f.read())
+                self.expenses = dict(enumerate(data["expenses"] or []))
+                self.incomes = dict(enumerate(data["incomes"] or []))
         except (FileNotFoundError, json.JSONDecodeError):
-            with open("finance_data.txt", "r") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-
-                    line_parts = line.split("|")
-                    tag = line_parts[0]
-
-                    if tag == "Income":
-                        if len(line_parts) != 3:
-                            raise ValueError(f"Bad Income line: {line}")
-                        self.incomes.append(
-                            {"source": line_parts[1], "amount": float(line_parts[2])}
-                        )
-                    elif tag == "Expense":
-                        if len(line_parts) != 5:
-                            raise ValueError(f"Bad Expense line: {line}")
-                        self.expenses.append(
-                            {
-                                "description": line_parts[1],
-                                "category": line_parts[2],
-                                "amount": float(line_parts[3]),
-                                "date": line_parts[4],
-                            }
-                        )
-                    else:
-                        raise ValueError(f"Unknown line format: {line}")
+            # export_txt writes UTF-8, read it back the same way
+            with open("finance_data.txt", "r", encoding="utf-8") as f:
+                text = f.read()
+            incomes = []
+            expenses = []
+            # bind the appends once instead of looking them up for every line
+            incomes_append = incomes.append
+            expenses_append = expenses.append
+            for line in text.splitlines():
+                line = line.strip()
+                if not line:
+                    continue
+
+                line_parts = line.split("|")
+                tag = line_parts[0]
+
+                if tag == "Income":
+                    if len(line_parts) != 3:
+                        raise ValueError(f"Bad Income line: {line}")
+                    incomes_append(
+                        {"source": line_parts[1], "amount": float(line_parts[2])}
+                    )
+                elif tag == "Expense":
+                    if len(line_parts) != 5:
+                        raise ValueError(f"Bad Expense line: {line}")
+                    expenses_append(
+                        {
+                            "description": line_parts[1],
+                            "category": line_parts[2],
+                            "amount": float(line_parts[3]),
+                            "date": line_parts[4],
+                        }
+                    )
+                else:
+                    raise ValueError(f"Unknown line format: {line}")
+            self.incomes = dict(enumerate(incomes))
+            self.expenses = dict(enumerate(expenses))
+
+
+def _atomic_write(path: str, payload: bytes):
+    # write next to the target and swap it in, so a crash mid-write never
+    # leaves a truncated file behind for load_from_file to trip over
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        # don't leave a half-written temp file behind
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# record formatters, bound once so the loops over every record don't
+# look up the template or build an f-string per item
+format_income_line = "Income|{source}|{amount}\n".format_map
+format_expense_line = "Expense|{description}|{category}|{amount}|{date}\n".format_map
+format_income_row = "{source}  |  ${amount:.2f}".format_map
+format_expense_row = "{date}  |  {description}  |  {category}  |  ${amount:.2f}".format_map
 
 
 def parse_float(text: str, field_name: str) -> float:
@@ -127,6 +255,9 @@ def parse_float(text: str, field_name: str) -> float:
         value = float(text)
     except ValueError:
         raise ValueError(f"{field_name} must be a number.")
+    # orjson writes inf/nan as null, which would break the next load
+    if not math.isfinite(value):
+        raise ValueError(f"{field_name} must be a finite number.")
     if value < 0:
         raise ValueError(f"{field_name} can't be negative.")
     return value
@@ -138,7 +269,15 @@ def parse_date(text: str) -> str:
         if not text:
             # use toda's date by default
             return datetime.today().strftime("%Y-%m-%d")
-        datetime.strptime(text, "%Y-%m-%d")
+        # a precompiled regex is much cheaper than strptime for the format check
+        m = _DATE_RE.fullmatch(text)
+        if not m:
+            raise ValueError
+        year, month, day = map(int, m.groups())
+        if not (1 <= month <= 12 and 1 <= day <= 31):
+            raise ValueError
+        # still reject dates like 2024-02-30
+        datetime(year, month, day)
         return text
     except:
         raise ValueError("Date format should be %Y-%m-%d")
@@ -159,12 +298,23 @@ class FinanceManager(tk.Tk):
         self.total_income_var = tk.StringVar(value="0.00")
         self.total_expenses_var = tk.StringVar(value="0.00")
         self.balance_var = tk.StringVar(value="0.00")
+        self._flush_pending = False
+        # (date, formatted string) so strftime only runs when the day changes
+        self._today_cache = (None, None)
+        # make sure nothing is lost if the window is closed before the next flush
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
 
         self._build_ui()
-        self._process_income_change()
-        self._process_expense_change()
+        self._rebuild_income_list()
+        self._process_totals()
 
     def _build_ui(self):
+        menubar = tk.Menu(self)
+        file_menu = tk.Menu(menubar, tearoff=0)
+        file_menu.add_command(label="Export as text...", command=self._export_txt)
+        menubar.add_cascade(label="File", menu=file_menu)
+        self.config(menu=menubar)
+
         top = ttk.Frame(self)
         top.pack()
         forms = ttk.Frame(top)
@@ -175,14 +325,14 @@ class FinanceManager(tk.Tk):
         self._build_expense_form(forms).pack(
             side="left", fill="x", expand=True, padx=(8, 0)
         )
-        mid = ttk.Frame(self, padding=(10, 0, 10, 10))
+        mid = ttk.Notebook(self, padding=(10, 0, 10, 10))
         mid.pack(fill="both", expand=True)
-        self._build_income_list(mid).pack(
-            side="left", fill="both", expand=True, padx=(0, 8)
-        )
-        self._build_expense_list(mid).pack(
-            side="left", fill="both", expand=True, padx=(8, 0)
-        )
+        mid.add(self._build_income_list(mid), text="Income")
+        # expense list is built and populated the first time its tab is shown
+        self._expense_tab = ttk.Frame(mid)
+        self._expense_tab_built = False
+        mid.add(self._expense_tab, text="Expenses")
+        mid.bind("<<NotebookTabChanged>>", self._on_tab_changed)
 
         self._build_totals_bar().pack(fill="x", padx=10, pady=(0, 10))
 
@@ -210,7 +360,7 @@ class FinanceManager(tk.Tk):
         self.expense_description = tk.StringVar()
         self.expense_category = tk.StringVar()
         self.expense_amount = tk.StringVar()
-        self.expense_date = tk.StringVar(value=datetime.today().strftime("%Y-%m-%d"))
+        self.expense_date = tk.StringVar(value=self._today_str())
         self.expense_categories = [
             "Housing",
             "Utilities",
@@ -223,6 +373,8 @@ class FinanceManager(tk.Tk):
             "Entertainment & Recreation",
             "Savings & Investments"
         ]
+        # the list keeps the Combobox order, the set is for validation
+        self._category_set = frozenset(self.expense_categories)
 
         ttk.Label(box, text="Description").grid(
             row=0, column=0, sticky="e", padx=5, pady=4
@@ -268,6 +420,16 @@ class FinanceManager(tk.Tk):
         ttk.Button(btns, text="Delete", command=self.delete_expense).pack()
         return box
 
+    def _on_tab_changed(self, event):
+        if self._expense_tab_built:
+            return
+        if event.widget.select() != str(self._expense_tab):
+            return
+
+        self._build_expense_list(self._expense_tab).pack(fill="both", expand=True)
+        self._expense_tab_built = True
+        self._rebuild_expense_list()
+
     def _build_totals_bar(self):
         bar = ttk.Frame(self)
         ttk.Label(bar, text="Total Income:").pack(side="left", padx=(0, 6))
@@ -291,9 +453,11 @@ class FinanceManager(tk.Tk):
             amount = self.income_amount.get().strip()
             parsed_amount = parse_float(amount, "Amount")
 
-            self.data.add_income(source, parsed_amount)
+            income_id = self.data.add_income(source, parsed_amount)
+            self._schedule_flush()
             self._reset_income_form()
-            self._process_income_change()
+            self._append_income_row(income_id)
+            self._process_totals()
         except ValueError as e:
             messagebox.showerror("Income Error", str(e))
 
@@ -309,13 +473,20 @@ class FinanceManager(tk.Tk):
                 raise ValueError("Description is required.")
             if not category:
                 raise ValueError("Category is required.")
+            if category not in self._category_set:
+                raise ValueError("Please pick a category from the list.")
 
             amount = parse_float(self.expense_amount.get().strip(), "Amount")
             date_str = parse_date(self.expense_date.get())
 
-            self.data.add_expense(description, category, amount, date_str)
+            # everything is validated above, skip the second round of checks
+            expense_id = self.data._add_expense_raw(
+                description, category, amount, date_str
+            )
+            self._schedule_flush()
             self._reset_expense_form()
-            self._process_expense_change()
+            self._append_expense_row(expense_id)
+            self._process_totals()
         except ValueError as e:
             messagebox.showerror("Expense Error", str(e))
 
@@ -323,7 +494,13 @@ class FinanceManager(tk.Tk):
         self.expense_description.set("")
         self.expense_category.set(self.expense_categories[0])
         self.expense_amount.set("")
-        self.expense_date.set(datetime.today().strftime("%Y-%m-%d"))
+        self.expense_date.set(self._today_str())
+
+    def _today_str(self) -> str:
+        today = date.today()
+        if self._today_cache[0] != today:
+            self._today_cache = (today, today.strftime("%Y-%m-%d"))
+        return self._today_cache[1]
 
     def delete_income(self):
         sel = self.income_list.curselection()
@@ -334,8 +511,10 @@ class FinanceManager(tk.Tk):
         if sel[0] == 0:
             return
 
-        self.data.delete_income(sel[0] - 1)
-        self._process_income_change()
+        self.data.delete_income(self._income_row_ids[sel[0] - 1])
+        self._schedule_flush()
+        self._remove_income_row(sel[0])
+        self._process_totals()
 
     def delete_expense(self):
         sel = self.expense_list.curselection()
@@ -346,27 +525,93 @@ class FinanceManager(tk.Tk):
         if sel[0] == 0:
             return
 
-        self.data.delete_expense(sel[0] - 1)
-        self._process_expense_change()
+        self.data.delete_expense(self._expense_row_ids[sel[0] - 1])
+        self._schedule_flush()
+        self._remove_expense_row(sel[0])
+        self._process_totals()
+
+    def _export_txt(self):
+        path = filedialog.asksaveasfilename(
+            defaultextension=".txt",
+            initialfile="finance_data.txt",
+            filetypes=[("Text files", "*.txt")],
+        )
+        if not path:
+            return
 
-    def _process_income_change(self):
+        try:
+            self.data.export_txt(path)
+        except OSError as e:
+            messagebox.showerror("Export Error", str(e))
+
+    def _schedule_flush(self):
+        # a burst of edits within 500ms ends up as a single save
+        if self._flush_pending:
+            return
+        self._flush_pending = True
+        self.after(500, self._flush)
+
+    def _flush(self):
+        self._flush_pending = False
+        try:
+            self.data.flush()
+        except OSError as e:
+            # data stays dirty, the next edit or closing the window retries
+            messagebox.showerror("Save Error", str(e))
+
+    def _on_close(self):
+        # a failed save must not keep the window from closing
+        try:
+            self.data.flush()
+        except OSError as e:
+            messagebox.showerror("Save Error", f"Changes could not be saved: {e}")
+        finally:
+            self.destroy()
+
+    def _rebuild_income_list(self):
         # delete evrything from UI and re-populate from self.data
+        # only needed on initial load, edits update single rows
         self.income_list.delete(0, tk.END)
-        self.income_list.insert(tk.END, "Income Source  |  Amount")
-        for i in self.data.incomes:
-            self.income_list.insert(tk.END, f"{i['source']}  |  ${i['amount']:.2f}")
-        self._process_totals()
-
-    def _process_expense_change(self):
+        # Listbox.insert takes any number of items, one call is one Tcl round trip
+        rows = map(format_income_row, self.data.incomes.values())
+        self.income_list.insert(tk.END, "Income Source  |  Amount", *rows)
+        # record id for each list row, in display order
+        self._income_row_ids = list(self.data.incomes)
+
+    def _append_income_row(self, income_id: int):
+        self.income_list.insert(tk.END, format_income_row(self.data.incomes[income_id]))
+        self._income_row_ids.append(income_id)
+
+    def _remove_income_row(self, row: int):
+        # row 0 is the header, so list rows are offset by one from the ids
+        self.income_list.delete(row)
+        del self._income_row_ids[row - 1]
+
+    def _rebuild_expense_list(self):
         # delete evrything from UI and re-populate from self.data
+        # only needed on initial load, edits update single rows
         self.expense_list.delete(0, tk.END)
-        self.expense_list.insert(tk.END, "Date  |  Description  |  Category  |  Amount")
-        for e in self.data.expenses:
-            self.expense_list.insert(
-                tk.END,
-                f"{e['date']}  |  {e['description']}  |  {e['category']}  |  ${e['amount']:.2f}",
-            )
-        self._process_totals()
+        # Listbox.insert takes any number of items, one call is one Tcl round trip
+        rows = map(format_expense_row, self.data.expenses.values())
+        self.expense_list.insert(
+            tk.END, "Date  |  Description  |  Category  |  Amount", *rows
+        )
+        # record id for each list row, in display order
+        self._expense_row_ids = list(self.data.expenses)
+
+    def _append_expense_row(self, expense_id: int):
+        # the list picks up all expenses once its tab is built
+        if not self._expense_tab_built:
+            return
+        self.expense_list.insert(
+            tk.END, format_expense_row(self.data.expenses[expense_id])
+        )
+        self._expense_row_ids.append(expense_id)
+
+    def _remove_expense_row(self, row: int):
+        # row 0 is the header, so list rows are offset by one from the ids
+        self.expense_list.delete(row)
+        del self._expense_row_ids[row - 1]
 
     def _process_totals(self):
         self.total_income_var.set(f"${self.data.total_income():.2f}")
@@ -1,5 +1,14 @@
+import os
+import tempfile
 import unittest
-from assignment7 import DataHandler, parse_date, parse_float
+from unittest import mock
+from assignment7 import (
+    DataHandler,
+    _json_dumps,
+    _json_loads,
+    parse_date,
+    parse_float,
+)
 
 
 class TestDataHandler(unittest.TestCase):
@@ -15,24 +24,50 @@ class TestDataHandler(unittest.TestCase):
     def test_parse_float_negative(self):
         self.assertRaises(ValueError, parse_float, "-1", "Amount")
 
+    def test_parse_float_not_finite(self):
+        self.assertRaises(ValueError, parse_float, "inf", "Amount")
+        self.assertRaises(ValueError, parse_float, "nan", "Amount")
+
+    def test_json_round_trip(self):
+        data = {
+            "incomes": [{"source": "job", "amount": 1123.45}],
+            "expenses": [
+                {
+                    "description": "café",
+                    "category": "Food",
+                    "amount": 12,
+                    "date": "2024-01-20",
+                }
+            ],
+        }
+        self.assertEqual(_json_loads(_json_dumps(data)), data)
+
     def test_parse_date(self):
         self.assertEqual(parse_date("2024-01-20"), "2024-01-20")
 
     def test_parse_date_invalid(self):
         self.assertRaises(ValueError, parse_date, "20222-123-123")
 
+    def test_parse_date_out_of_range(self):
+        self.assertRaises(ValueError, parse_date, "2024-13-01")
+        self.assertRaises(ValueError, parse_date, "2023-02-29")
+
     def test_income_addition(self):
         dh = DataHandler(autosave=False)
         # make sure that saved values don't mess with test
-        dh.incomes = []
-        dh.expenses = []
+        dh.clear()
         dh.add_income("job", 1123)
-        self.assertListEqual(dh.incomes, [{"source": "job", "amount": 1123}])
+        self.assertListEqual(list(dh.incomes.values()), [{"source": "job", "amount": 1123}])
 
     def test_income_addition_negative(self):
         dh = DataHandler(autosave=False)
         self.assertRaises(ValueError, dh.add_income, "job", -1)
 
+    def test_income_addition_not_finite(self):
+        dh = DataHandler(autosave=False)
+        self.assertRaises(ValueError, dh.add_income, "job", float("inf"))
+        self.assertRaises(ValueError, dh.add_income, "job", float("nan"))
+
     def test_income_addition_empty_source(self):
         dh = DataHandler(autosave=False)
         self.assertRaises(ValueError, dh.add_income, "   ", 100)
@@ -40,11 +75,10 @@ class TestDataHandler(unittest.TestCase):
     def test_expense_addition(self):
         dh = DataHandler(autosave=False)
         # make sure that saved values don't mess with test
-        dh.incomes = []
-        dh.expenses = []
+        dh.clear()
         dh.add_expense("car lease", "transportation", 500, "2024-01-20")
         self.assertListEqual(
-            dh.expenses,
+            list(dh.expenses.values()),
             [
                 {
                     "description": "car lease",
@@ -61,6 +95,17 @@ class TestDataHandler(unittest.TestCase):
             ValueError, dh.add_expense, "car lease", "transportation", -10, "2024-01-01"
         )
 
+    def test_expense_addition_not_finite(self):
+        dh = DataHandler(autosave=False)
+        self.assertRaises(
+            ValueError,
+            dh.add_expense,
+            "car lease",
+            "transportation",
+            float("nan"),
+            "2024-01-01",
+        )
+
     def test_expense_addition_empty_description(self):
         dh = DataHandler(autosave=False)
         self.assertRaises(
@@ -82,8 +127,7 @@ class TestDataHandler(unittest.TestCase):
     def test_balance(self):
         dh = DataHandler(autosave=False)
         # make sure that saved values don't mess with test
-        dh.incomes = []
-        dh.expenses = []
+        dh.clear()
         dh.add_income("job", 1123)
         dh.add_expense("car lease", "transportation", 500, "2024-01-20")
         self.assertEqual(dh.balance(), 623)
@@ -91,8 +135,7 @@ class TestDataHandler(unittest.TestCase):
     def test_total_income(self):
         dh = DataHandler(autosave=False)
         # make sure that saved values don't mess with test
-        dh.incomes = []
-        dh.expenses = []
+        dh.clear()
         dh.add_income("job", 1123)
         dh.add_income("stocks", 1000)
         dh.add_income("side hustle", 100)
@@ -101,12 +144,100 @@ class TestDataHandler(unittest.TestCase):
     def test_total_expenses(self):
         dh = DataHandler(autosave=False)
         # make sure that saved values don't mess with test
-        dh.incomes = []
-        dh.expenses = []
+        dh.clear()
         dh.add_expense("car lease", "transportation", 500, "2024-01-20")
         dh.add_expense("rent", "housing", 2000, "2024-01-01")
         self.assertEqual(dh.total_expenses(), 2500)
 
+    def test_totals_after_delete(self):
+        dh = DataHandler(autosave=False)
+        # make sure that saved values don't mess with test
+        dh.clear()
+        dh.add_income("job", 1123)
+        dh.add_income("stocks", 1000)
+        dh.add_expense("car lease", "transportation", 500, "2024-01-20")
+        dh.add_expense("rent", "housing", 2000, "2024-01-01")
+        dh.delete_income(0)
+        dh.delete_expense(1)
+        self.assertEqual(dh.total_income(), 1000)
+        self.assertEqual(dh.total_expenses(), 500)
+        self.assertEqual(dh.balance(), 500)
+
+        # 0.1 + 0.2 + 0.3 minus the same amounts doesn't come back to 0.0
+        dh.clear()
+        for amount in (0.1, 0.2, 0.3):
+            dh.add_income("job", amount)
+            dh.add_expense("lunch", "food", amount, "2024-01-20")
+        for record_id in range(3):
+            dh.delete_income(record_id)
+            dh.delete_expense(record_id)
+        self.assertEqual(dh.total_income(), 0.0)
+        self.assertEqual(dh.total_expenses(), 0.0)
+        self.assertEqual(f"${dh.balance():.2f}", "$0.00")
+
+    def test_export_txt(self):
+        dh = DataHandler(autosave=False)
+        # make sure that saved values don't mess with test
+        dh.clear()
+        dh.add_income("job", 1123)
+        dh.add_expense("car lease", "transportation", 500, "2024-01-20")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "export.txt")
+            dh.export_txt(path)
+            self.assertListEqual(os.listdir(tmp), ["export.txt"])
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(
+                    f.read(),
+                    "Expense|car lease|transportation|500|2024-01-20\nIncome|job|1123\n",
+                )
+
+    def test_export_txt_failure_cleans_up(self):
+        dh = DataHandler(autosave=False)
+        with tempfile.TemporaryDirectory() as tmp:
+            # the target is a directory, so replacing it fails
+            path = os.path.join(tmp, "export.txt")
+            os.mkdir(path)
+            self.assertRaises(OSError, dh.export_txt, path)
+            self.assertListEqual(os.listdir(tmp), ["export.txt"])
+
+    def test_txt_fallback_non_ascii(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                dh = DataHandler(autosave=False)
+                dh.add_expense("café", "food", 4.5, "2024-01-20")
+                dh.export_txt("finance_data.txt")
+                # no JSON file, so loading falls back to the txt file
+                loaded = DataHandler(autosave=False)
+            finally:
+                os.chdir(cwd)
+        self.assertTrue(loaded.files_loaded)
+        self.assertEqual(loaded.expenses[0]["description"], "café")
+
+    def test_flush_writes_only_when_dirty(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                dh = DataHandler(autosave=True)
+                with mock.patch.object(
+                    dh, "save_to_file", wraps=dh.save_to_file
+                ) as save:
+                    dh.flush()
+                    self.assertEqual(save.call_count, 0)
+                    self.assertFalse(os.path.exists("finance_data.json"))
+
+                    dh.add_income("job", 1123)
+                    dh.add_income("stocks", 1000)
+                    dh.flush()
+                    dh.flush()
+                    self.assertEqual(save.call_count, 1)
+                loaded = DataHandler(autosave=False)
+            finally:
+                os.chdir(cwd)
+        self.assertEqual(loaded.total_income(), 2123)
+
 
 if __name__ == "__main__":
     unittest.main()